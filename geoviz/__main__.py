@@ -0,0 +1,10 @@
+""" `python -m geoviz` fills the on-disk shape cache, e.g. as an image/env build step """
+
+from geoviz.preprocess import SHAPE_CACHE_DIR, precompute_shapes
+
+cache_files = precompute_shapes()
+if cache_files:
+    print(f'{len(cache_files)} simplified shapes cached in {SHAPE_CACHE_DIR}')
+else:
+    print('nothing was cached: pyarrow is not installed, or GEOVIZ_CACHE_DIR is empty or not '
+          'writable')
@@ -1,9 +1,41 @@
 """ module to plot choropleths """
 
-from bokeh import plotting, models, io
+import gzip
+import numbers
+import shutil
+import warnings
+from collections import ChainMap
+from functools import lru_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None    # optional, only needed for formatting['compress'] = 'br'
+
+import numpy as np
+import pandas as pd
+from bokeh import models    ## bokeh.plotting/bokeh.io are imported where used, to speed up import
 
 import geoviz.preprocess as prc
-from geoviz.params import DEFAULTFORMAT, PALETTES, HEIGHT_RATIO, get_palette_colors
+from geoviz.params import (DEFAULTFORMAT, HEIGHT_RATIO, SVG_MAX_PATCHES, get_palette,
+                           get_palette_colors)
+
+## color mapper class for each formatting['lin_or_log'] option
+_MAPPERS = {'lin':models.LinearColorMapper, 'log':models.LogColorMapper}
+
+@lru_cache(maxsize=16)    ## as prc._load_shape, whose shapes these are
+def _cached_xs_ys(geography, simplify, epsg):
+    """ Patch coordinates of a bundled shapefile. Every state/county layer (draw_state, plot_empty)
+    goes through here, so each (geography, simplify, epsg) is converted once per session. """
+    shape_df = prc.shape_geojson(geography, simplify, epsg=epsg)
+    return prc.geometry_xs_ys(shape_df.geometry)
+
+
+@lru_cache(maxsize=64)
+def _tooltips(geolabel, y_var, hover_geolabel, hover_ylabel, tooltip_text):
+    """ Hover tooltip (label, field) pairs, cached since the same columns are plotted repeatedly """
+    return ((hover_geolabel, f'@{geolabel}'), (hover_ylabel, f'@{y_var}{tooltip_text}'))
+
 
 def initialize_plot(formatting):
     """ Create Bokeh figure to which glyphs/elements can be added.
@@ -11,21 +43,40 @@ def initialize_plot(formatting):
     :param (dict) formatting: see DEFAULTFORMAT from params.py
     :return: Bokeh figure object """
 
+    from bokeh import plotting
+
     bkplot = plotting.figure(title=formatting['title'],
                              background_fill_color=formatting['background_color'],
                              plot_width=formatting['width'],
                              plot_height=int(formatting['width']*HEIGHT_RATIO),
-                             tools=formatting['tools'], active_drag=None)
+                             tools=formatting['tools'], active_drag=None,
+                             border_fill_color=None, outline_line_color=None)
     bkplot.add_tools(models.BoxZoomTool(match_aspect=True))
     bkplot.title.text_font = formatting['font']
     bkplot.title.text_font_size = formatting['title_fontsize']
     bkplot.grid.grid_line_color = None
     bkplot.axis.visible = False
-    bkplot.border_fill_color = None
-    bkplot.outline_line_color = None
     return bkplot
 
 
+def make_geo_source(geo_df, columns=()):
+    """ Builds a patch data source from a GeoDataFrame: the xs/ys coordinates Bokeh patches draw,
+    plus only the given columns (e.g. for color mapping and hover), not the whole DataFrame.
+    Coordinates already carried in '_xs'/'_ys' columns (see merge_shapes) are used as is.
+
+    :param (gpd.DataFrame) geo_df: geopandas DataFrame with 'geometry' column
+    :param (list) columns: column names to include in the data source
+    :return: Bokeh ColumnDataSource """
+
+    if '_xs' in geo_df and '_ys' in geo_df:
+        xs, ys = list(geo_df['_xs']), list(geo_df['_ys'])
+    else:
+        xs, ys = prc.geometry_xs_ys(geo_df.geometry)
+    geo_data = {col:geo_df[col].to_numpy() for col in columns}
+    geo_data.update(xs=xs, ys=ys)
+    return models.ColumnDataSource(data=geo_data)
+
+
 def draw_main(bkplot, geo_df, y_var, y_type, geolabel, formatting):
     """ Adds choropleth based on specified y_var to an existing Bokeh plot.
 
@@ -37,7 +88,7 @@ def draw_main(bkplot, geo_df, y_var, y_type, geolabel, formatting):
     :param (dict) formatting: see DEFAULTFORMAT from params.py
     :return: None (adds to Bokeh object) """
 
-    geo_src = models.GeoJSONDataSource(geojson=geo_df.to_json())
+    geo_src = make_geo_source(geo_df, [y_var, geolabel] if geolabel in geo_df else [y_var])
     cmap = make_color_mapper(geo_df[y_var], y_type, formatting)
 
     shapes = bkplot.patches('xs', 'ys', fill_color={'field':y_var, 'transform': cmap},
@@ -50,40 +101,56 @@ def draw_main(bkplot, geo_df, y_var, y_type, geolabel, formatting):
 
     hover = models.HoverTool(renderers=[shapes])
     hover_ylabel = y_var if formatting['hover_ylabel'] is None else formatting['hover_ylabel']
-    hover.tooltips = [(formatting['hover_geolabel'], f'@{geolabel}'),
-                      (hover_ylabel, f'@{y_var}{formatting["tooltip_text"]}')]
+    hover.tooltips = list(_tooltips(geolabel, y_var, formatting['hover_geolabel'], hover_ylabel,
+                                    formatting['tooltip_text']))
     bkplot.add_tools(hover)
 
 
+@lru_cache(maxsize=64)
+def _palette_colors(y_type, palette, ncolors, reverse):
+    """ Hexcodes of a named/ranked palette, cached as an immutable tuple. Only the palette is cached:
+    Bokeh models belong to a single document, so the color mapper itself is built per plot. """
+
+    try:
+        colors = get_palette(y_type, palette, ncolors)
+    except KeyError: ## if palette is not in default list
+        colors = get_palette_colors(palette, ncolors)
+    return tuple(reversed(colors)) if reverse else tuple(colors)
+
+
 def make_color_mapper(y_values, y_type, formatting):
     """ Generates color mapper which takes in values and outputs the color hexcode.
 
-    :param (pd.Series) y_values: pandas Series to be plotted, for calculating min/max
+    :param (pd.Series) y_values: pandas Series to be plotted, for calculating min/max (NaNs ignored)
     :param (str) y_type: 'sequential', 'divergent', or 'categorical' -- for palette
     :param (dict) formatting: see DEFAULTFORMAT from params.py
     :return: Bokeh colormapper object """
 
-    try:
-        palette = PALETTES[y_type][formatting['palette']][formatting['ncolors']].copy()
-    except KeyError: ## if palette is not in default list
-        palette = get_palette_colors(formatting['palette'], formatting['ncolors']).copy()
-    except TypeError: ## if formatting['palette'] is a list
-        palette = formatting['palette'].copy()
-
-    if formatting['reverse_palette']:
-        palette.reverse()
+    if isinstance(formatting['palette'], (list, tuple)): ## if formatting['palette'] is a list
+        palette = list(formatting['palette'])
+        if formatting['reverse_palette']:
+            palette.reverse()
+    else:
+        palette = list(_palette_colors(y_type, formatting['palette'], formatting['ncolors'],
+                                       formatting['reverse_palette']))
 
     if y_type in ['sequential', 'divergent']:
-        c_min = formatting['min'] if isinstance(formatting['min'], (int, float)) else min(y_values)
-        c_max = formatting['max'] if isinstance(formatting['max'], (int, float)) else max(y_values)
+        c_min, c_max = formatting['min'], formatting['max']
+        ## only reduce over the data for bounds that were not supplied (numpy scalars count too)
+        if not isinstance(c_min, numbers.Real) or not isinstance(c_max, numbers.Real):
+            y_array = np.asarray(y_values, dtype=float)
+            if not isinstance(c_min, numbers.Real):
+                c_min = float(np.nanmin(y_array))
+            if not isinstance(c_max, numbers.Real):
+                c_max = float(np.nanmax(y_array))
         below_color = formatting['low_color'] if isinstance(formatting['low_color'], str) else None
-        above_color = formatting['high_color'] if isinstance(formatting['low_color'], str) else None
+        above_color = formatting['high_color'] if isinstance(formatting['high_color'], str) else None
 
-        mapper_fx = {'lin':models.LinearColorMapper, 'log':models.LogColorMapper}
-        mapper = mapper_fx[formatting['lin_or_log']](palette=palette, low=c_min, high=c_max,
-                                                     low_color=below_color, high_color=above_color)
+        mapper = _MAPPERS[formatting['lin_or_log']](palette=palette, low=c_min, high=c_max,
+                                                    low_color=below_color, high_color=above_color)
     else:
-        mapper = models.CategoricalColorMapper(factors=y_values.unique(), palette=palette)
+        mapper = models.CategoricalColorMapper(factors=list(y_values.unique()),
+                                              palette=palette)
     return mapper
 
 
@@ -94,15 +161,17 @@ def make_color_bar(cmap, formatting):
     :param (dict) formatting: see DEFAULTFORMAT from params.py
     :return: None (adds to Bokeh object) """
 
+    ## used twice below; formatting is a ChainMap in plot(), where each lookup is a Python call
+    font, fontsize = formatting['font'], formatting['cbar_fontsize']
     color_bar = models.ColorBar(color_mapper=cmap, label_standoff=10, location='bottom_right',
                                 height=formatting['cbar_height'], background_fill_color=None,
-                                major_label_text_font_size=formatting['cbar_fontsize'],
-                                major_label_text_font=formatting['font'],
+                                major_label_text_font_size=fontsize,
+                                major_label_text_font=font,
                                 major_tick_line_color=formatting['cbar_tick_color'],
                                 major_tick_line_alpha=formatting['cbar_tick_alpha'],
                                 title=formatting['cbar_title'],
-                                title_text_font_size=formatting['cbar_fontsize'],
-                                title_text_font=formatting['font'],
+                                title_text_font_size=fontsize,
+                                title_text_font=font,
                                 title_text_align=formatting['cbar_title_align'],
                                 title_text_font_style=formatting['cbar_style'],
                                 title_standoff=int(formatting['width'] * \
@@ -112,20 +181,56 @@ def make_color_bar(cmap, formatting):
     return color_bar
 
 
-def draw_state(bkplot, formatting):
-    """ Adds a state choropleth (default is transparent fill) to an existing Bokeh plot.
+def make_state_source(formatting):
+    """ Builds the data source for the state layer from the cached state coordinates.
+
+    :param (dict) formatting: see DEFAULTFORMAT from params.py
+    :return: Bokeh ColumnDataSource """
+
+    xs, ys = _cached_xs_ys('state', formatting['simplify'], formatting['epsg'])
+    return models.ColumnDataSource(data={'xs':xs, 'ys':ys})
+
+
+def draw_state_patches(bkplot, state_source, formatting):
+    """ Adds state patches from an existing data source to an existing Bokeh plot.
 
     :param (Bokeh object) plot: pre-defined Bokeh figure
+    :param (Bokeh object) state_source: data source from make_state_source()
     :param (dict) formatting: see DEFAULTFORMAT from params.py
     :return: None (adds to Bokeh object) """
 
-    state_geojson = prc.shape_geojson('state', formatting['simplify'], epsg=formatting['epsg']).to_json()
-    state_source = models.GeoJSONDataSource(geojson=state_geojson)
     bkplot.patches('xs', 'ys', source=state_source,
                    fill_color=formatting['st_fill'], fill_alpha=formatting['st_alpha'],
                    line_color=formatting['st_line_color'], line_width=formatting['st_line_width'])
 
 
+def draw_state_lines(bkplot, state_source, formatting):
+    """ Adds state outlines (no fill) from an existing data source to an existing Bokeh plot.
+
+    :param (Bokeh object) plot: pre-defined Bokeh figure
+    :param (Bokeh object) state_source: data source from make_state_source()
+    :param (dict) formatting: see DEFAULTFORMAT from params.py
+    :return: None (adds to Bokeh object) """
+
+    bkplot.multi_line('xs', 'ys', source=state_source,
+                      line_color=formatting['st_line_color'], line_width=formatting['st_line_width'])
+
+
+def draw_state(bkplot, formatting, state_source=None):
+    """ Adds a state choropleth (default is transparent fill) to an existing Bokeh plot.
+
+    :param (Bokeh object) plot: pre-defined Bokeh figure
+    :param (dict) formatting: see DEFAULTFORMAT from params.py
+    :param (Bokeh object) state_source: data source from make_state_source(), to share one source
+                                        between several state layers. default builds a new one
+    :return: the state data source, for reuse by other layers of the same plot """
+
+    if state_source is None:
+        state_source = make_state_source(formatting)
+    draw_state_patches(bkplot, state_source, formatting)
+    return state_source
+
+
 def draw_choropleth_layers(bkplot, geo_df, y_var, y_type, geolabel, formatting):
     """ Draws multi-layer choropleths (main + state outlines)
 
@@ -137,35 +242,90 @@ def draw_choropleth_layers(bkplot, geo_df, y_var, y_type, geolabel, formatting):
     :param (dict) formatting: see DEFAULTFORMAT from params.py
     :return: None (adds to Bokeh object) """
 
+    ## a single source is shared by both state layers when state_outline is 'both'
+    state_source = None
     if formatting['state_outline'] in ['before', 'both']:
-        draw_state(bkplot, formatting)
+        state_source = draw_state(bkplot, formatting)
     draw_main(bkplot, geo_df, y_var, y_type, geolabel, formatting)
     if formatting['state_outline'] == 'after':
         draw_state(bkplot, formatting)
     elif formatting['state_outline'] == 'both':
-        temp_formatting = formatting.copy()
-        temp_formatting['st_fill'] = None
-        draw_state(bkplot, temp_formatting)
+        ## outline only: lines avoid a second (empty) fill pass over the same patches
+        draw_state_lines(bkplot, state_source, formatting)
+
+
+def set_svg_backend(bkplot, stacklevel=3):
+    """ Switches the plot to the SVG backend, warning when there are enough patches that the SVG
+    renderer will be noticeably slower than the default canvas.
+
+    :param (Bokeh object) plot: pre-defined Bokeh figure
+    :param (int) stacklevel: passed to warnings.warn, so the warning points at the user's call.
+                             default 3, the caller of the plotting function calling this
+    :return: None (modifies Bokeh object) """
+
+    npatches = sum(len(renderer.data_source.data.get('xs', [])) for renderer in bkplot.renderers
+                   if isinstance(renderer, models.GlyphRenderer))
+    if npatches > SVG_MAX_PATCHES:
+        warnings.warn(f'SVG output with {npatches} patches will render slowly; '
+                      'consider the default canvas backend (svg=None) instead.',
+                      stacklevel=stacklevel)
+    bkplot.output_backend = 'svg'
 
 
-def save_plot(bkplot, output=False):
+def save_plot(bkplot, output=False, compress=None):
     """ Determines how choropleth plot is saved.
 
     :param (Bokeh object) plot: pre-defined Bokeh figure
     :param (str) output: filepath to save html file. if not specified, plots in notebook
+    :param (str) compress: 'gzip' or 'br' to also write a compressed copy of the html file
+                           (output + '.gz' / '.br'), e.g. for static hosts that serve it with
+                           Content-Encoding. default None
     :return: None (adds to Bokeh object) """
 
+    from bokeh import io
+
     if output:
         io.output_file(output)
         io.save(bkplot, output)
+        if compress:
+            compress_html(output, compress)
     else:
         io.output_notebook(hide_banner=True)
-        plotting.show(bkplot)
+        io.show(bkplot)
+
+
+def _check_compress(compress):
+    """ Validates formatting['compress'] before anything is rendered or written.
+
+    :param (str) compress: None, 'gzip' or 'br'
+    :return: None (raises ValueError, or ImportError if 'br' is requested without brotli) """
+
+    if compress not in (None, 'gzip', 'br'):
+        raise ValueError(f"compress must be 'gzip' or 'br', got {compress!r}")
+    if compress == 'br' and brotli is None:
+        raise ImportError("formatting['compress'] = 'br' requires the brotli package")
+
+
+def compress_html(output, compress='gzip'):
+    """ Writes a gzip or brotli compressed copy of a saved html file next to it.
+
+    :param (str) output: filepath of the html file
+    :param (str) compress: 'gzip' (writes output + '.gz') or 'br' (writes output + '.br')
+    :return: filepath of the compressed copy """
+
+    _check_compress(compress)
+    if compress == 'gzip':
+        with open(output, 'rb') as html, gzip.open(f'{output}.gz', 'wb') as compressed:
+            shutil.copyfileobj(html, compressed)
+        return f'{output}.gz'
+    with open(output, 'rb') as html, open(f'{output}.br', 'wb') as compressed:
+        compressed.write(brotli.compress(html.read(), quality=11))
+    return f'{output}.br'
 
 
 def plot(file_or_df, geoid_var, geoid_type, y_var, y_type, geolvl='county', geolabel='name',
          formatting=None, output=False, dropna=True):
-    """Short summary.
+    """Plot a choropleth of y_var, merging the data onto the state or county shapes.
 
     :param (str/pd.DataFrame) file_or_df: csv filepath or pandas/geopandas DataFrame with geoid_var
     :param (str) geoid_var: name of column containing the geo ID to match on
@@ -177,32 +337,112 @@ def plot(file_or_df, geoid_var, geoid_type, y_var, y_type, geolvl='county', geol
     :param (dict) formatting: if custom dict is passed, update DEFAULTFORMAT with those key-values
     :param (str) output: if specified, filepath to save html file. see save_plot().
     :param (bool) dropna: default True, if false, keeps rows where y_var is nan.
-    :return: if output is 'bokeh', returns Bokeh object; else None """
+    :return: Bokeh figure object (also saved to output, or shown in the notebook) """
 
-    ## get default plot formatting and update if necessary
-    temp_format = DEFAULTFORMAT.copy()
-    if formatting:
-        temp_format.update(formatting)
+    ## overlay formatting on the defaults without copying them; DEFAULTFORMAT is left untouched
+    temp_format = ChainMap(dict(formatting or {}), DEFAULTFORMAT)
+    _check_compress(temp_format['compress'])
+
+    ## rows without a y_var value are dropped on the data side, before the (geometry) merge
+    geo_df = merge_shapes(file_or_df, geoid_var, geoid_type, geolvl, geolabel, temp_format,
+                          y_vars=[y_var], dropna_var=y_var if dropna else None)
+    return plot_geo_df(geo_df, y_var, y_type, geolabel, temp_format, output, stacklevel=3)
 
-    ## process data
-    shape_df = prc.shape_geojson(geolvl, temp_format['simplify'], epsg=temp_format['epsg'])
-    geo_df = prc.merge_to_geodf(shape_df, file_or_df, geoid_var, geoid_type, geolvl=geolvl)
 
-    if dropna:
-        geo_df = geo_df[geo_df[y_var].notnull()]
+def plot_many(file_or_df, geoid_var, geoid_type, y_vars, y_type, geolvl='county', geolabel='name',
+              formatting=None, outputs=None, dropna=True):
+    """Plot one choropleth per variable in y_vars (e.g. one per year), reading the data and merging
+    it onto the shapes only once.
+
+    :param (str/pd.DataFrame) file_or_df: csv filepath or pandas/geopandas DataFrame with geoid_var
+    :param (str) geoid_var: name of column containing the geo ID to match on
+    :param (str) geoid_type: 'fips' (recommended), 'cbsa', 'name', or 'abbrev' (state only)
+    :param (list) y_vars: column names of the variables to plot
+    :param (str) y_type: 'sequential', 'sequential_single' (hue), 'divergent', or 'categorical'
+    :param (str) geolvl: 'county' or 'state'
+    :param (str) geolabel: column name to use. default is county/state name from shapefile
+    :param (dict) formatting: if custom dict is passed, update DEFAULTFORMAT with those key-values
+    :param (list) outputs: if specified, one html filepath per y_var (same length). see save_plot().
+    :param (bool) dropna: default True, if false, keeps rows where y_var is nan.
+    :return: list of Bokeh figure objects, in the order of y_vars """
+
+    if outputs is not None and len(outputs) != len(y_vars):
+        raise ValueError(f'outputs has {len(outputs)} filepaths for {len(y_vars)} y_vars')
+    temp_format = ChainMap(dict(formatting or {}), DEFAULTFORMAT)
+    _check_compress(temp_format['compress'])
+    geo_df = merge_shapes(file_or_df, geoid_var, geoid_type, geolvl, geolabel, temp_format,
+                          y_vars=y_vars)
+
+    bkplots = []
+    for y_var, output in zip(y_vars, outputs or [False] * len(y_vars)):
+        y_df = geo_df.iloc[geo_df[y_var].notna().to_numpy()] if dropna else geo_df
+        bkplots.append(plot_geo_df(y_df, y_var, y_type, geolabel, temp_format, output,
+                                   stacklevel=3))
+    return bkplots
+
+
+def merge_shapes(file_or_df, geoid_var, geoid_type, geolvl, geolabel, formatting, y_vars=(),
+                 dropna_var=None):
+    """ Loads the state or county shapes and merges the data onto them.
+
+    :param (str/pd.DataFrame) file_or_df: csv filepath or pandas/geopandas DataFrame with geoid_var
+    :param (str) geoid_var: name of column containing the geo ID to match on
+    :param (str) geoid_type: 'fips' (recommended), 'cbsa', 'name', or 'abbrev' (state only)
+    :param (str) geolvl: 'county' or 'state'
+    :param (str) geolabel: column name to use. default is county/state name from shapefile
+    :param (dict) formatting: see DEFAULTFORMAT from params.py
+    :param (list) y_vars: columns to plot, kept from the shapes too (e.g. 'census_area')
+    :param (str) dropna_var: if specified, data rows where this column is nan are not merged
+    :return: merged geopandas DataFrame """
+
+    shape_df = prc.shape_geojson(geolvl, formatting['simplify'], epsg=formatting['epsg'])
+    ## only the geo ID, the hover label and the plotted columns are needed from the shapes
+    shape_cols = {prc.shape_geoid_column(geolvl, geoid_type), geolabel, *y_vars}
+    shape_df = shape_df[[col for col in shape_df.columns
+                         if col in shape_cols and col != shape_df.geometry.name]
+                        + [shape_df.geometry.name]]
+    ## the cached patch coordinates of each shape ride along through the merge, so plots do not
+    ## convert the geometries to xs/ys again (see make_geo_source)
+    xs, ys = _cached_xs_ys(geolvl, formatting['simplify'], formatting['epsg'])
+    shape_df = shape_df.assign(_xs=pd.Series(xs, dtype=object, index=shape_df.index),
+                               _ys=pd.Series(ys, dtype=object, index=shape_df.index))
+    return prc.merge_to_geodf(shape_df, file_or_df, geoid_var, geoid_type, geolvl=geolvl,
+                              dropna_var=dropna_var)
+
+
+def plot_geo_df(geo_df, y_var, y_type, geolabel, formatting, output=False, stacklevel=2):
+    """ Plots a choropleth of y_var from an already merged geopandas DataFrame.
+
+    :param (gpd.DataFrame) geo_df: merged geopandas DataFrame from merge_shapes()
+    :param (str) y_var: column name of variable to plot
+    :param (str) y_type: 'sequential', 'sequential_single' (hue), 'divergent', or 'categorical'
+    :param (str) geolabel: column name to use. default is county/state name from shapefile
+    :param (dict) formatting: see DEFAULTFORMAT from params.py
+    :param (str) output: if specified, filepath to save html file. see save_plot().
+    :param (int) stacklevel: stack level of the user's call for warnings, relative to this
+                             function (as in warnings.warn). default 2, the direct caller
+    :return: Bokeh figure object (also saved to output, or shown in the notebook) """
+
+    ## only the geometry, plotted variable and hover label are drawn; drop everything else early
+    keep_cols = [geo_df.geometry.name, y_var]
+    if geolabel in geo_df and geolabel not in keep_cols:
+        keep_cols.append(geolabel)
+    keep_cols += [col for col in ['_xs', '_ys'] if col in geo_df]
+    geo_df = geo_df[keep_cols]
 
     ## make sure column name does not have spaces -- important for hover tooltip
-    geo_df.rename(columns={y_var:y_var.replace(' ', '_')}, inplace=True)
+    geo_df = geo_df.rename(columns={y_var:y_var.replace(' ', '_')})
     y_var = y_var.replace(' ', '_')
 
     ## plot and save choropleth
-    bkplot = initialize_plot(temp_format)
-    draw_choropleth_layers(bkplot, geo_df, y_var, y_type, geolabel, temp_format)
+    bkplot = initialize_plot(formatting)
+    draw_choropleth_layers(bkplot, geo_df, y_var, y_type, geolabel, formatting)
 
-    if temp_format['svg']:
-        bkplot.output_backend = 'svg'
-    save_plot(bkplot, output)
+    if formatting['svg']:
+        set_svg_backend(bkplot, stacklevel=stacklevel + 1)
+    save_plot(bkplot, output, formatting['compress'])
     ## return to original state
+    from bokeh import io
     io.reset_output()
 
     return bkplot
@@ -214,16 +454,19 @@ def plot_empty(geo='state', formatting=None, output=False):
     :param (str) geo: 'state' or 'county'
     :param (dict) formatting: if custom dict is passed, update DEFAULTFORMAT with those key-values
     :param (str) output: if specified, filepath to save html file. see save_plot().
-    :return: if output is 'bokeh', returns Bokeh object; else None """
+    :return: Bokeh figure object (also saved to output, or shown in the notebook) """
 
-    ## get default plot formatting and update if necessary
-    temp_format = DEFAULTFORMAT.copy()
-    if formatting:
-        temp_format.update(formatting)
+    ## overlay formatting on the defaults without copying them; DEFAULTFORMAT is left untouched
+    temp_format = ChainMap(dict(formatting or {}), DEFAULTFORMAT)
+    _check_compress(temp_format['compress'])
 
     ## process data
-    shape_df = prc.shape_geojson(geo, temp_format['simplify'], epsg=temp_format['epsg'])
-    geo_src = models.GeoJSONDataSource(geojson=shape_df.to_json())
+    if geo in ['state', 'county']:
+        xs, ys = _cached_xs_ys(geo, temp_format['simplify'], temp_format['epsg'])
+        geo_src = models.ColumnDataSource(data={'xs':xs, 'ys':ys})
+    else:
+        geo_src = make_geo_source(prc.shape_geojson(geo, temp_format['simplify'],
+                                                    epsg=temp_format['epsg']))
 
     ## plot and save choropleth
     bkplot = initialize_plot(temp_format)
@@ -231,9 +474,10 @@ def plot_empty(geo='state', formatting=None, output=False):
                    line_width=temp_format['line_width'], source=geo_src)
 
     if temp_format['svg']:
-        bkplot.output_backend = 'svg'
-    save_plot(bkplot, output)
+        set_svg_backend(bkplot)
+    save_plot(bkplot, output, temp_format['compress'])
     ## return to original state
+    from bokeh import io
     io.reset_output()
 
     return bkplot
@@ -1,25 +1,29 @@
 """
 Parameters for geoviz
 """
-from bokeh.palettes import *
+import bokeh.palettes as _bp
 
 def get_palette_colors(palette_label, ncolors):
     """ gets hexcodes of specified palette and reverses the order """
-    color_palette = list(eval(f'{palette_label}{ncolors}')).copy()
-    color_palette.reverse()
-    return color_palette
+    return list(getattr(_bp, f'{palette_label}{ncolors}'))[::-1]
 
 ## shapefile height to width ratio
 HEIGHT_RATIO = 0.6
 
+## above this many patches, warn that the svg backend will be slow (e.g. county maps)
+SVG_MAX_PATCHES = 1000
+
+## simplify tolerances prepared by preprocess.precompute_shapes()
+SIMPLIFY_LEVELS = [0, 0.01, 0.028, 0.05, 0.1]
+
 ## legal statistical area definition
-LSAD = ['county', 'parish', 'city', 'borough', 'cty&bor', 'census area',
+LSAD = ['county', 'parish', 'city', 'borough', 'city and borough', 'cty&bor', 'census area',
         'muny', 'municipio', 'municipality']
 
 ## all parameters
 DEFAULTFORMAT = {'width':900, 'background_color':None,
                  'title':'', 'font':'futura', 'title_fontsize':'14pt',
-                 'tools':'pan,reset,save', 'svg':None,
+                 'tools':'pan,reset,save', 'svg':None, 'compress':None,
                  ## main map properties
                  'fill_alpha':1, 'line_color':'#d3d3d3', 'line_width':0.5, 'simplify':0, 'epsg':2163,
                  'tooltip_text':'', 'hover_geolabel':'Area name', 'hover_ylabel':None,
@@ -43,16 +47,37 @@ palette_dict = {'sequential': ['RdPu', 'YlGnBu', 'YlOrRd'],
 ##
 max_n = {'sequential':9, 'sequential_single':9, 'divergent':11, 'categorical':8}
 
-## get all palettes
-PALETTES = {ptype:{} for ptype in palette_dict}
-for ptype in palette_dict:
-    for rank, label in enumerate(palette_dict[ptype]):
-        PALETTES[ptype][label] = {}
-        PALETTES[ptype][rank+1] = {}
-        for n in range(3, max_n[ptype]+1):
-            palette = get_palette_colors(label, n)
-            PALETTES[ptype][label][n] = palette
-            PALETTES[ptype][rank+1][n] = palette
-## add custom locus color
-for i in PALETTES['sequential'][2]:
-    PALETTES['sequential'][2][i][-1] = '#0a3959'
+## custom locus color, replacing the darkest color of the 2nd sequential palette
+LOCUS_COLOR = '#0a3959'
+
+def get_palette(ptype, palette, ncolors):
+    """ gets hexcodes of one of the default palettes, by label or rank (1-3) within its type
+
+    :param (str) ptype: 'sequential', 'sequential_single', 'divergent', or 'categorical'
+    :param (str/int) palette: palette label (see palette_dict) or rank within palette_dict[ptype]
+    :param (int) ncolors: number of colors, 3 to max_n[ptype]
+    :return: list of hexcodes; KeyError if not a default palette """
+
+    labels = palette_dict[ptype]
+    if isinstance(palette, int) and 1 <= palette <= len(labels):
+        palette = labels[palette - 1]
+    if palette not in labels or not 3 <= ncolors <= max_n[ptype]:
+        raise KeyError((ptype, palette, ncolors))
+    colors = get_palette_colors(palette, ncolors)
+    if ptype == 'sequential' and palette == labels[1]:
+        colors[-1] = LOCUS_COLOR
+    return colors
+
+
+def __getattr__(name):
+    """ builds PALETTES, the table of all default palettes, on first access only (PEP 562) """
+    if name != 'PALETTES':
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    palettes = {ptype:{} for ptype in palette_dict}
+    for ptype, labels in palette_dict.items():
+        for rank, label in enumerate(labels):
+            palettes[ptype][label] = {n:get_palette(ptype, label, n)
+                                      for n in range(3, max_n[ptype]+1)}
+            palettes[ptype][rank+1] = palettes[ptype][label]
+    globals()['PALETTES'] = palettes
+    return palettes
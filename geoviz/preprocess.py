@@ -5,33 +5,365 @@ try:
 except ImportError:
     import importlib_resources as pkg_resources    # Try backported to PY<37 `importlib_resources`
 
+import json
+import os
+import re
+from functools import lru_cache
+from importlib.util import find_spec
+from itertools import chain
+
+import numpy as np
 import pandas as pd
 import geopandas as gpd
+import shapely
 
-from geoviz.params import LSAD
+from geoviz.params import LSAD, SIMPLIFY_LEVELS
 from . import data
 
+## optional dependencies, only probed here: importing them would slow down every `import geoviz`
+_HAS_PYARROW = find_spec('pyarrow') is not None    # on-disk shape cache (feather files)
+_HAS_PYOGRIO = find_spec('pyogrio') is not None    # vectorized (much faster than fiona) reads
+
+## simplified bundled shapes are saved here as feather files; set GEOVIZ_CACHE_DIR='' to disable
+SHAPE_CACHE_DIR = os.environ.get('GEOVIZ_CACHE_DIR',
+                                 os.path.join(os.environ.get('XDG_CACHE_HOME',
+                                                             os.path.expanduser('~/.cache')),
+                                              'geoviz'))
+
+
+def _suffix_regex(words):
+    """ Regex matching one of the words as the last word of a name, optionally followed by a comma
+    and more (e.g. ' County' in 'Wake County, North Carolina', but not in 'Hillsborough') """
+    return re.compile(r'\s+(?:' + '|'.join(re.escape(word) for word in words) + r')(?:,.*)?\s*$',
+                      re.IGNORECASE)
+
+## compiled once, for strip_name and its vectorized use in merge_to_geodf
+_LSAD_RE = _suffix_regex(LSAD)
+
+
+## bump when the simplification of the bundled shapes changes, so stale cache files are not read
+_SIMPLIFY_VERSION = 2
+
+
+def _shape_cache_file(geography, simplify):
+    """ Path of the on-disk cache for a bundled shapefile, or None if there is no disk cache """
+    if not _HAS_PYARROW or not SHAPE_CACHE_DIR:
+        return None
+    from geoviz import __version__    ## bundled shapes may change between releases
+    return os.path.join(SHAPE_CACHE_DIR, f'{geography}_arcs{_SIMPLIFY_VERSION}_{float(simplify)}'
+                                         f'_v{__version__}.feather')
+
+
+def _simplify(geo_df, simplify):
+    """ Simplifies the geometry column in place, in one vectorized shapely call (none if 0) """
+    if not simplify:
+        return
+    simplified = shapely.simplify(np.asarray(geo_df.geometry.values), simplify,
+                                  preserve_topology=True)
+    geo_df[geo_df.geometry.name] = gpd.GeoSeries(simplified, crs=geo_df.crs, index=geo_df.index)
+
+
+def _decode_arcs(topology):
+    """ Decodes the arcs of a TopoJSON topology (2D positions) into one array of coordinates.
+
+    :param (dict) topology: parsed TopoJSON
+    :return: (coordinates, index of the first coordinate of each arc, number of coordinates per arc)
+    """
+
+    arcs = topology['arcs']
+    lengths = np.array([len(arc) for arc in arcs])
+    starts = np.cumsum(lengths) - lengths
+    points = np.fromiter(chain.from_iterable(chain.from_iterable(arcs)), dtype=float).reshape(-1, 2)
+    if 'transform' in topology:
+        ## quantized positions are deltas from the previous position of the same arc
+        points = np.cumsum(points, axis=0)
+        arc_offsets = np.zeros((len(arcs), 2))
+        arc_offsets[1:] = points[starts[1:] - 1]
+        points -= np.repeat(arc_offsets, lengths, axis=0)
+        points = points * topology['transform']['scale'] + topology['transform']['translate']
+    return points, starts, lengths
+
+
+def _simplify_arcs(points, lengths, simplify):
+    """ Simplifies every arc of a topology once, so that neighbouring shapes keep sharing exactly
+    the same border (no slivers) and shared borders are not simplified twice. Arc endpoints
+    (where borders meet) are always kept.
+
+    :param (np.array) points: arc coordinates, as returned by _decode_arcs
+    :param (np.array) lengths: number of coordinates per arc
+    :param (float) simplify: simplify tolerance
+    :return: (coordinates, index of the first coordinate of each arc, number of coordinates per arc)
+    """
+
+    arcs = shapely.linestrings(points, indices=np.repeat(np.arange(len(lengths)), lengths))
+    arcs = shapely.simplify(arcs, simplify, preserve_topology=True)
+    points, arc_index = shapely.get_coordinates(arcs, return_index=True)
+    lengths = np.bincount(arc_index, minlength=len(arcs))
+    return points, np.cumsum(lengths) - lengths, lengths
+
+
+def _parse_topojson(topojson):
+    """ Parses the first object of a TopoJSON topology (Polygon/MultiPolygon features) into flat
+    arrays: decoded arcs, the arc references of each ring, and the ring/polygon counts.
+
+    :param (str) topojson: TopoJSON text
+    :return: dict of numpy arrays, plus the 'properties' DataFrame and 'crs' """
+
+    topology = json.loads(topojson)
+    points, arc_starts, arc_lengths = _decode_arcs(topology)
+    features = next(iter(topology['objects'].values()))['geometries']
+
+    ## flatten features -> polygons -> rings -> arc references
+    geom_types, polygons_per_geom, rings_per_polygon, ring_arcs = [], [], [], []
+    for feature in features:
+        geom_types.append(feature.get('type'))
+        polygons = {'Polygon':[feature.get('arcs')],
+                    'MultiPolygon':feature.get('arcs')}.get(feature.get('type'), [])
+        polygons_per_geom.append(len(polygons))
+        for rings in polygons:
+            rings_per_polygon.append(len(rings))
+            ring_arcs.extend(rings)
+
+    properties = pd.DataFrame([feature.get('properties', {}) for feature in features])
+    for col in properties.columns[properties.dtypes == object]:
+        ## columns mixing numbers and strings (e.g. fips) are read as strings, as GDAL does
+        properties[col] = properties[col].astype(str).where(properties[col].notna())
+    int32 = np.iinfo(np.int32)
+    for col in properties.columns[properties.dtypes == np.int64]:
+        ## integer properties that fit in 32 bits are read as int32, as GDAL does
+        if properties[col].between(int32.min, int32.max).all():
+            properties[col] = properties[col].astype(np.int32)
+    if any('id' in feature for feature in features):
+        properties.insert(0, 'id', [str(feature.get('id')) for feature in features])
+
+    return {'points':points, 'arc_starts':arc_starts, 'arc_lengths':arc_lengths,
+            'arc_refs':np.array([arc for arcs in ring_arcs for arc in arcs], dtype=int),
+            'arcs_per_ring':np.array([len(arcs) for arcs in ring_arcs], dtype=int),
+            'rings_per_polygon':np.array(rings_per_polygon, dtype=int),
+            'polygons_per_geom':np.array(polygons_per_geom, dtype=int),
+            'geom_types':np.array(geom_types, dtype=object), 'properties':properties,
+            'crs':topology.get('crs', {}).get('properties', {}).get('name')}
+
+
+def _stitch_rings(topo, points, arc_starts, arc_lengths, arc_ids):
+    """ Stitches the rings of a parsed topology together from the given arcs in bulk.
+
+    :param (dict) topo: parsed topology from _parse_topojson() -- not modified
+    :param (np.array) points: arc coordinates
+    :param (np.array) arc_starts: index of the first coordinate of each arc
+    :param (np.array) arc_lengths: number of coordinates per arc
+    :param (np.array) arc_ids: arc (in points) of each of topo's arc references
+    :return: numpy array of shapely geometries, one per feature """
+
+    arcs_per_ring = topo['arcs_per_ring']
+    nrings = len(arcs_per_ring)
+
+    ## coordinates of each arc reference; a negative reference (~i) is arc i reversed, and every
+    ## arc after the first in a ring skips its first position (the previous arc's last position)
+    forward = topo['arc_refs'] >= 0
+    skip = np.ones(len(arc_ids), dtype=int)
+    skip[np.cumsum(arcs_per_ring) - arcs_per_ring] = 0
+    sizes = arc_lengths[arc_ids] - skip
+    first = np.where(forward, arc_starts[arc_ids] + skip,
+                     arc_starts[arc_ids] + arc_lengths[arc_ids] - 1 - skip)
+    steps = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    coords = points[np.repeat(first, sizes) + np.repeat(np.where(forward, 1, -1), sizes) * steps]
+
+    ring_sizes = np.bincount(np.repeat(np.arange(nrings), arcs_per_ring), weights=sizes,
+                             minlength=nrings).astype(int)
+    offsets = [np.concatenate([[0], np.cumsum(counts)]).astype(int)
+               for counts in [ring_sizes, topo['rings_per_polygon'], topo['polygons_per_geom']]]
+    geometries = shapely.from_ragged_array(shapely.GeometryType.MULTIPOLYGON, coords, offsets)
+
+    ## every feature was built as a MultiPolygon; unwrap the single polygons again
+    is_polygon = topo['geom_types'] == 'Polygon'
+    geometries[is_polygon] = shapely.get_geometry(geometries[is_polygon], 0)
+    geometries[~np.isin(topo['geom_types'], ['Polygon', 'MultiPolygon'])] = None
+    return geometries
+
+
+def _build_topojson(topo, simplify=0):
+    """ Stitches the rings of a parsed topology together from the shared arcs in bulk.
+
+    :param (dict) topo: parsed topology from _parse_topojson() -- not modified
+    :param (float) simplify: simplify tolerance applied to the shared arcs, 0 for no simplification
+    :return: geopandas DataFrame with 'id', property columns and 'geometry' """
+
+    points, arc_starts, arc_lengths = topo['points'], topo['arc_starts'], topo['arc_lengths']
+    arc_ids = np.where(topo['arc_refs'] >= 0, topo['arc_refs'], ~topo['arc_refs'])
+    geometries = _stitch_rings(topo, points, arc_starts, arc_lengths, arc_ids)
+    if simplify:
+        ## simplified arcs are appended after the original ones; rings that would collapse below
+        ## 4 positions (e.g. small islands) keep their original arcs here
+        simple_points, simple_starts, simple_lengths = _simplify_arcs(points, arc_lengths,
+                                                                      simplify)
+        nrings = len(topo['arcs_per_ring'])
+        ring_ids = np.repeat(np.arange(nrings), topo['arcs_per_ring'])
+        skip = np.ones(len(arc_ids), dtype=int)
+        skip[np.cumsum(topo['arcs_per_ring']) - topo['arcs_per_ring']] = 0
+        collapsed = np.bincount(ring_ids, weights=simple_lengths[arc_ids] - skip,
+                                minlength=nrings) < 4
+        simplified = _stitch_rings(topo, np.concatenate([points, simple_points]),
+                                   np.concatenate([arc_starts, simple_starts + len(points)]),
+                                   np.concatenate([arc_lengths, simple_lengths]),
+                                   np.where(collapsed[ring_ids], arc_ids,
+                                            arc_ids + len(arc_lengths)))
+
+        ## arcs are simplified one at a time, so nothing stops them from crossing each other;
+        ## shapes that end up invalid or with a collapsed ring are simplified on their own instead
+        ## (as custom shapefiles are, see _simplify)
+        geom_ids = np.repeat(np.repeat(np.arange(len(geometries)), topo['polygons_per_geom']),
+                             topo['rings_per_polygon'])
+        fallback = ~shapely.is_valid(simplified)
+        fallback[geom_ids[collapsed]] = True
+        simplified[fallback] = shapely.simplify(geometries[fallback], simplify,
+                                                preserve_topology=True)
+        geometries = simplified
+
+    return gpd.GeoDataFrame(topo['properties'].copy(), geometry=geometries, crs=topo['crs'])
+
+
+def read_topojson(topojson, simplify=0):
+    """ Reads the first object of a TopoJSON topology (Polygon/MultiPolygon features) as a
+    geopandas DataFrame, stitching the rings together from the shared arcs in bulk.
+
+    :param (str) topojson: TopoJSON text
+    :param (float) simplify: simplify tolerance applied to the shared arcs, 0 for no simplification
+    :return: geopandas DataFrame with 'id', property columns and 'geometry' """
+
+    return _build_topojson(_parse_topojson(topojson), simplify)
+
+
+@lru_cache(maxsize=2)
+def _load_topology(geography):
+    """ Parses one of the bundled TopoJSON files once per session, so that each new simplify
+    tolerance only pays for simplifying and stitching the arcs -- do not mutate the result. """
+    shape_file = {'county':'us-albers-counties.json.txt', 'state':'us-albers.json.txt'}[geography]
+    return _parse_topojson(pkg_resources.read_text(data, shape_file))
+
+
+@lru_cache(maxsize=16)
+def _load_shape(geography, simplify):
+    """ Reads one of the bundled shapefiles, simplifying its shared arcs (topology-preserving, so
+    neighbouring shapes have no gaps or overlaps between them). Cached in memory, so repeated plots
+    only pay for parsing/simplifying once per (geography, simplify) -- do not mutate the returned
+    DataFrame. If pyarrow is installed the result is also cached on disk across sessions. """
+
+    cache_file = _shape_cache_file(geography, simplify)
+    if cache_file and os.path.exists(cache_file):
+        try:
+            return gpd.read_feather(cache_file)
+        except (ImportError, OSError, ValueError):
+            pass    ## unreadable cache file, rebuild it below
+
+    geo_df = _build_topojson(_load_topology(geography), simplify)
+
+    if cache_file:
+        try:
+            os.makedirs(SHAPE_CACHE_DIR, exist_ok=True)
+            temp_file = f'{cache_file}.{os.getpid()}.tmp'
+            geo_df.to_feather(temp_file)
+            os.replace(temp_file, cache_file)
+        except (ImportError, OSError, TypeError, ValueError):
+            pass    ## cache not writable/serializable, keep going without the disk cache
+    return geo_df
+
+
+def _read_file(path):
+    """ gpd.read_file with the fastest engine available: pyogrio reads all features in bulk (and
+    as Arrow tables if pyarrow is installed too), fiona iterates over them in Python """
+    if not _HAS_PYOGRIO:
+        return gpd.read_file(path)
+    return gpd.read_file(path, engine='pyogrio', use_arrow=_HAS_PYARROW)
+
+
+@lru_cache(maxsize=8)
+def _read_shapefile(path, mtime, simplify):
+    """ Reads and simplifies a custom shapefile. mtime is only there as part of the cache key, so
+    an edited file is read again -- do not mutate the returned DataFrame. """
+
+    print('reading in geojson/shape file...')
+    if str(path).endswith('.parquet'):
+        ## GeoParquet (binary, columnar) skips text parsing entirely; needs pyarrow
+        geo_df = gpd.read_parquet(path)
+    else:
+        geo_df = _read_file(path)
+    _simplify(geo_df, simplify)
+    return geo_df
+
+
 def shape_geojson(geography='county', simplify=0.028, epsg=2163):
     """ Loads GeoJSON/TopoJSON/shapefiles as geopandas DataFrame. String argument available only
     for composite state and county GeoJSON.
 
-    :param (str) geography: 'state', 'county', or filepath
+    :param (str) geography: 'state', 'county', or filepath (GeoJSON, TopoJSON, shapefile, or
+                            GeoParquet '.parquet' -- the fastest to read for large custom shapes)
     :param (float) simplify: how much to simplify the geojson shapes; where 0 is unsimplified, and
                              0.1 being the recommended max simplification.
     :return: geopandas DataFrame with 'geometry' column for plotting """
 
-    if geography == 'county':
-        # geo_df = gpd.read_file('geoviz/data/shapefiles/us-albers-counties.json.txt')
-        geo_df = gpd.read_file(pkg_resources.read_text(data, 'us-albers-counties.json.txt'))
-    elif geography == 'state':
-        # geo_df = gpd.read_file('geoviz/data/shapefiles/us-albers.json.txt')
-        geo_df = gpd.read_file(pkg_resources.read_text(data, 'us-albers.json.txt'))
-    else:
-        ## if using custom shapefile
-        print('reading in geojson/shape file...')
-        geo_df = gpd.read_file(geography)
-    geo_df['geometry'] = geo_df.simplify(simplify)
-    return geo_df
+    if geography in ['county', 'state']:
+        return _load_shape(geography, simplify).copy()
+
+    ## if using custom shapefile; local files are cached until they are modified, urls are not
+    if not os.path.isfile(geography):
+        return _read_shapefile.__wrapped__(geography, None, simplify)
+    return _read_shapefile(geography, os.path.getmtime(geography), simplify).copy()
+
+
+def precompute_shapes(simplify_levels=SIMPLIFY_LEVELS):
+    """ Loads and simplifies the bundled state and county shapes at each tolerance up front, so
+    later plots at these tolerances skip simplification (as do later sessions, via the disk cache,
+    if pyarrow is installed). Not run at import, since it takes a few seconds on a cold cache;
+    `python -m geoviz` runs it, e.g. as an image/env build step.
+
+    :param (list) simplify_levels: simplify tolerances to prepare, default SIMPLIFY_LEVELS
+    :return: list of the cache files on disk for the prepared shapes (empty if none were cached)
+    """
+
+    cache_files = []
+    for geography in ['state', 'county']:
+        for simplify in simplify_levels:
+            _load_shape(geography, simplify)
+            cache_file = _shape_cache_file(geography, simplify)
+            if cache_file and os.path.exists(cache_file):
+                cache_files.append(cache_file)
+    return cache_files
+
+
+def geometry_xs_ys(geometries, dtype=np.float32):
+    """ Converts (multi)polygons to the coordinate arrays drawn by Bokeh patches: one x and one y
+    array per shape, with the exterior rings of its parts separated by NaN. As with Bokeh's
+    GeoJSONDataSource, interior rings (holes) are not drawn.
+
+    :param (gpd.GeoSeries) geometries: Polygon/MultiPolygon geometries
+    :param (np.dtype) dtype: coordinate dtype. default float32, which is well below a pixel even
+                             for US-wide maps, and halves the data embedded in the html output
+    :return: (xs, ys) lists of numpy arrays, one element per geometry """
+
+    geometries = np.asarray(geometries, dtype=object)
+    if not len(geometries):
+        return [], []
+    parts, part_geom = shapely.get_parts(geometries, return_index=True)
+    coords, coord_part = shapely.get_coordinates(shapely.get_exterior_ring(parts),
+                                                 return_index=True)
+    coords = coords.astype(dtype, copy=False)
+
+    ## NaN separator in front of every part that continues the previous part's geometry
+    part_sizes = np.bincount(coord_part, minlength=len(parts))
+    part_starts = np.cumsum(part_sizes) - part_sizes
+    continues = np.zeros(len(parts), dtype=bool)
+    continues[1:] = part_geom[1:] == part_geom[:-1]
+    coords = np.insert(coords, part_starts[continues], np.nan, axis=0)
+
+    ## split the flat coordinates back into one array per geometry
+    nparts = np.bincount(part_geom, minlength=len(geometries))
+    geom_sizes = np.bincount(part_geom, weights=part_sizes, minlength=len(geometries)).astype(int)
+    geom_sizes += np.maximum(nparts - 1, 0)
+    splits = np.cumsum(geom_sizes)[:-1]
+    xs = np.split(np.ascontiguousarray(coords[:, 0]), splits)
+    ys = np.split(np.ascontiguousarray(coords[:, 1]), splits)
+    return xs, ys
 
 
 def strip_name(name, remove=LSAD):
@@ -41,13 +373,9 @@ def strip_name(name, remove=LSAD):
     :param (list) remove: default is Legal Statistical Area Definition (see params.py)
     :return: processed name """
 
-    length = len(name)
+    regex = _LSAD_RE if remove is LSAD else _suffix_regex(remove)
+    return regex.sub('', name)
 
-    for flag_word in remove:
-        if flag_word in name.lower():
-            clean_name = name.lower().split(flag_word)[0].strip()
-            length = len(clean_name)
-    return name[:length]
 
 def check_fips(fips_code, geolvl):
     """ forces fips code to have leading zeros """
@@ -57,6 +385,14 @@ def check_fips(fips_code, geolvl):
         fips_code = fips_code.rjust(digits, '0')
     return fips_code
 
+
+@lru_cache(maxsize=1)
+def _load_omb():
+    """ Reads the OMB CBSA/MSA -> county crosswalk once -- do not mutate the returned DataFrame """
+    # omb = pd.read_csv('geoviz/data/external/omb_msa_2017.csv', dtype=str)
+    return pd.read_csv(pkg_resources.open_text(data, 'omb_msa_2017.csv'), dtype=str)
+
+
 def cbsa_to_fips(msa_df, cbsa_var):
     """ Splits and duplicates rows in a CBSA/MSA dataset so the rows are the underlying counties.
     This is done using pd.merge(). If there are duplicate column names, the passed df is kept as is,
@@ -67,49 +403,93 @@ def cbsa_to_fips(msa_df, cbsa_var):
     :return: the new dataframe with additional columns ['cbsa', 'cbsa_name', 'county_name', 'fips']
     """
 
-    # omb = pd.read_csv('geoviz/data/external/omb_msa_2017.csv', dtype=str)
-    omb = pd.read_csv(pkg_resources.open_text(data, 'omb_msa_2017.csv'), dtype=str)
-    fips_df = omb.merge(msa_df, right_on=cbsa_var, left_on='cbsa',
-                        how='inner', suffixes=('_omb', ''))
+    fips_df = _load_omb().merge(msa_df, right_on=cbsa_var, left_on='cbsa',
+                                how='inner', suffixes=('_omb', ''))
     return fips_df
 
 
-def merge_to_geodf(shape_df, file_or_df, geoid_var, geoid_type, geolvl='county'):
+## property of the bundled shapes to merge on, for each geolvl and geoid_type
+_SHAPE_GEOID = {'state': {'fips':'fips_state', 'name':'name', 'abbrev':'iso_3166_2'},
+                'county': {'fips':'fips', 'name':'name'}}
+
+
+def shape_geoid_column(geolvl, geoid_type):
+    """ Column of the bundled state/county shapes that geo IDs of a given type are merged on.
+
+    :param (str) geolvl: 'county' or 'state'
+    :param (str) geoid_type: 'fips', 'cbsa' (merged on county FIPS), 'name', or 'abbrev' (state)
+    :return: column name in the DataFrame from shape_geojson() """
+
+    return _SHAPE_GEOID[geolvl]['fips' if geoid_type == 'cbsa' else geoid_type]
+
+
+def merge_to_geodf(shape_df, file_or_df, geoid_var, geoid_type, geolvl='county',
+                   dropna_var=None):
     """ Merges a DataFrame (or csv file) to a shape file on a geo ID (e.g FIPS code or name).
     If there are duplicate column names, the passed df is kept as is, while the duplicates from
-    the shapefile are suffixed with "_shape".
+    the shapefile are suffixed with "_shape" (except the geo ID itself, which is not duplicated).
 
     :param (gpd.DataFrame) shape_df: geopandas DataFrame
     :param (str/pd.DataFrame) file_or_df: csv filepath or pandas/geopandas DataFrame with geoid_var
     :param (str) geoid_var: if str, name of column containing the geo ID to match on.
     :param (str) geoid_type: 'fips' (recommended), 'name', or 'abbrev'
     :param (str) geolvl: 'county' or 'state' -- determines what attribute of geojson to merge on
+    :param (str) dropna_var: if specified, rows of file_or_df where this column is nan are dropped
+                             before merging (so their geometries are never copied)
     :return: merged DataFrame that has 'geometry' column for plotting shapes """
 
     ## if file is string and not DataFrame, read it in as dataframe
     if isinstance(file_or_df, str):
         file_or_df = pd.read_csv(file_or_df, dtype={geoid_var:str})
 
+    if dropna_var is not None and dropna_var in file_or_df:
+        file_or_df = file_or_df[file_or_df[dropna_var].notna()]
     df = file_or_df.copy()
     ## processing of geo variables
     if geoid_type == 'name':
-        df[geoid_var] = df[geoid_var].apply(strip_name)
+        df[geoid_var] = df[geoid_var].str.replace(_LSAD_RE, '', regex=True)
     elif geoid_type == 'cbsa':
         df = cbsa_to_fips(df, geoid_var)
         geoid_var = 'fips'
         geoid_type = 'fips'
 
-    digits = {'county':5, 'state':2}.get(geolvl)
-    if digits:
-        df[geoid_var] = df[geoid_var].str.rjust(digits, '0')
-
     ## identify which property of the geojson to merge on
-    shape_geoid = {'state': {'fips':'fips_state', 'name':'name', 'abbrev':'iso_3166_2'},
-                   'county': {'fips':'fips', 'name':'name'}}[geolvl][geoid_type]
-
-    geo_df = shape_df.merge(df, how='inner', left_on=shape_geoid, right_on=geoid_var,
-                            suffixes=('_shape', ''))
-    no_shape = set(df[geoid_var]) - set(geo_df[geoid_var])
-    if no_shape:
-        print(f'Areas with no shape found:\n{no_shape}')
+    shape_geoid = shape_geoid_column(geolvl, geoid_type)
+
+    if geoid_type == 'fips':
+        digits = {'county':5, 'state':2}.get(geolvl)
+        if digits and pd.api.types.is_string_dtype(df[geoid_var]):
+            df[geoid_var] = df[geoid_var].str.rjust(digits, '0')
+        ## merge FIPS codes as integers: int64 hashing, and codes match with or without leading
+        ## zeros (e.g. int columns); codes that are not numbers can not match any shape
+        shape_key = pd.to_numeric(shape_df[shape_geoid], errors='coerce')
+        key = pd.to_numeric(df[geoid_var], errors='coerce')
+    else:
+        ## names/abbreviations: categoricals sharing the same categories merge on their int codes
+        categories = pd.Index(shape_df[shape_geoid].dropna().unique())
+        shape_key = pd.Series(pd.Categorical(shape_df[shape_geoid], categories=categories),
+                              index=shape_df.index)
+        key = pd.Series(pd.Categorical(df[geoid_var], categories=categories), index=df.index)
+    matched = key.isin(shape_key.dropna()) & key.notna()
+
+    ## the geo IDs dropped by the inner merge
+    no_shape = pd.Index(df.loc[~matched, geoid_var]).unique()
+    if len(no_shape):
+        print(f'Areas with no shape found:\n{set(no_shape)}')
+
+    ## FIPS codes and abbreviations identify one shape each (names do not, e.g. 'Washington'),
+    ## so a duplicated shape ID raises instead of silently duplicating rows
+    try:
+        geo_df = shape_df.assign(_geoid_key=shape_key).merge(
+            df[matched].assign(_geoid_key=key[matched]), how='inner', on='_geoid_key',
+            suffixes=('_shape', ''), validate=None if geoid_type == 'name' else 'one_to_many')
+    except pd.errors.MergeError as err:
+        duplicated = shape_df.loc[shape_key.duplicated(keep=False) & shape_key.notna(),
+                                  shape_geoid]
+        raise ValueError(f'the shapes have duplicated {shape_geoid} values, so the data can not '
+                         f'be merged onto them: {sorted(set(duplicated))}') from err
+    ## merging on a column with the shape ID's name (e.g. 'fips', always for cbsa) would keep the
+    ## matched ID twice, so only the passed df's copy is kept
+    drop = ['_geoid_key'] + ([f'{shape_geoid}_shape'] if geoid_var == shape_geoid else [])
+    geo_df = geo_df.drop(columns=drop)
     return geo_df
@@ -15,12 +15,18 @@ setup(name='geoviz',
       license='MIT',
       packages=['geoviz', 'geoviz.data'],
       include_package_data=True,
-      install_requires=['pandas',
+      install_requires=['numpy<2',
+                        'pandas',
                         'matplotlib',
-                        'bokeh',
+                        'bokeh<3',
                         'geopandas',
+                        'shapely>=2.0',
                         'descartes',
                         'pysal',
                         'us',
                         "importlib_resources"
-                        ])
+                        ],
+      ## faster custom shapefile reads (pyogrio) and the on-disk shape cache (pyarrow, from 26 on it
+      ## needs numpy 2);
+      ## brotli for formatting['compress'] = 'br'
+      extras_require={'fast': ['pyogrio', 'pyarrow<26'], 'brotli': ['brotli']})
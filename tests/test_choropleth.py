@@ -0,0 +1,76 @@
+""" tests for geoviz.choropleth """
+
+from collections import ChainMap
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import geoviz.choropleth as chp
+from geoviz.params import DEFAULTFORMAT
+
+## explicit colorbar fonts, which the installed bokeh may not accept as None
+CBAR_FORMAT = {'cbar_fontsize':'10pt', 'cbar_style':'normal'}
+
+
+def test_compress_is_checked_before_saving(tmp_path):
+    output = tmp_path / 'empty.html'
+    with pytest.raises(ValueError):
+        chp.plot_empty(formatting={'compress':'zip'}, output=str(output))
+    assert not output.exists()
+
+
+@pytest.mark.skipif(chp.brotli is not None, reason='brotli is installed')
+def test_brotli_is_checked_before_saving(tmp_path):
+    output = tmp_path / 'empty.html'
+    with pytest.raises(ImportError):
+        chp.plot_empty(formatting={'compress':'br'}, output=str(output))
+    assert not output.exists()
+
+
+def test_gzip_copy(tmp_path):
+    output = tmp_path / 'empty.html'
+    chp.plot_empty(formatting={'compress':'gzip'}, output=str(output))
+    assert output.exists() and (tmp_path / 'empty.html.gz').exists()
+
+
+@pytest.mark.parametrize('plot_func', ['plot', 'plot_many'])
+def test_svg_warning_points_at_caller(plot_func, monkeypatch, tmp_path):
+    monkeypatch.setattr(chp, 'SVG_MAX_PATCHES', 0)
+    df = pd.DataFrame({'fips':['01', '06'], 'y':[1., 2.]})
+    args = (df, 'fips', 'fips', 'y', 'sequential') if plot_func == 'plot' \
+        else (df, 'fips', 'fips', ['y'], 'sequential')
+    output = str(tmp_path / 'svg.html')
+    kwargs = {'output':output} if plot_func == 'plot' else {'outputs':[output]}
+    with pytest.warns(UserWarning) as record:
+        getattr(chp, plot_func)(*args, geolvl='state', formatting={**CBAR_FORMAT, 'svg':True},
+                                **kwargs)
+    assert record[0].filename == __file__
+
+
+def test_plot_many_outputs_length():
+    df = pd.DataFrame({'fips':['01', '06'], 'y':[1., 2.], 'z':[3., 4.]})
+    with pytest.raises(ValueError):
+        chp.plot_many(df, 'fips', 'fips', ['y', 'z'], 'sequential', geolvl='state',
+                      outputs=['y.html'])
+
+
+def test_plot_shape_column(tmp_path):
+    ## a property of the shapes can be plotted, only the geo IDs come from the data
+    df = pd.DataFrame({'fips':['01001', '06037']})
+    bkplot = chp.plot(df, 'fips', 'fips', 'census_area', 'sequential', formatting=CBAR_FORMAT,
+                      output=str(tmp_path / 'area.html'))
+    assert len(bkplot.renderers[0].data_source.data['census_area']) == 2
+
+
+def test_color_mapper_numpy_bounds():
+    ## numpy scalars (e.g. from df[y_var].quantile()) are used as bounds, not recomputed
+    formatting = ChainMap({'min':np.float32(0.5), 'max':np.int64(10)}, DEFAULTFORMAT)
+    mapper = chp.make_color_mapper(pd.Series([0., 1., 100.]), 'sequential', formatting)
+    assert (mapper.low, mapper.high) == (0.5, 10)
+
+
+def test_color_mapper_high_color_alone():
+    formatting = ChainMap({'high_color':'#000000'}, DEFAULTFORMAT)
+    mapper = chp.make_color_mapper(pd.Series([0., 1.]), 'sequential', formatting)
+    assert (mapper.low_color, mapper.high_color) == (None, '#000000')
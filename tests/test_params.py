@@ -0,0 +1,58 @@
+""" tests for geoviz.params """
+
+import importlib
+
+import bokeh.palettes as bp
+import pytest
+
+import geoviz.params as params
+
+
+@pytest.fixture
+def fresh_params():
+    ## a freshly imported module, whose PALETTES table has not been built yet
+    return importlib.reload(params)
+
+
+def test_palettes_built_on_first_access(fresh_params):
+    assert 'PALETTES' not in vars(fresh_params)
+    assert fresh_params.PALETTES is fresh_params.PALETTES
+    with pytest.raises(AttributeError):
+        fresh_params.COLORS
+
+
+def test_palettes_match_bokeh(fresh_params):
+    ## the table as it was built at import: reversed bokeh palettes, keyed by label and rank,
+    ## with the locus color as the darkest color of the 2nd sequential palette
+    expected = {}
+    for ptype, labels in fresh_params.palette_dict.items():
+        expected[ptype] = {}
+        for rank, label in enumerate(labels):
+            expected[ptype][label] = expected[ptype][rank+1] = {
+                n:list(reversed(getattr(bp, f'{label}{n}')))
+                for n in range(3, fresh_params.max_n[ptype]+1)}
+    for colors in expected['sequential'][2].values():
+        colors[-1] = fresh_params.LOCUS_COLOR
+
+    assert fresh_params.PALETTES == expected
+
+
+def test_palettes_do_not_modify_bokeh(fresh_params):
+    names = [f'{label}{n}' for ptype, labels in fresh_params.palette_dict.items()
+             for label in labels for n in range(3, fresh_params.max_n[ptype]+1)]
+    before = {name:tuple(getattr(bp, name)) for name in names}
+    fresh_params.PALETTES
+    colors = fresh_params.get_palette('sequential', 2, 9)
+    colors.reverse()
+
+    assert {name:tuple(getattr(bp, name)) for name in names} == before
+    assert fresh_params.get_palette('sequential', 2, 9)[-1] == fresh_params.LOCUS_COLOR
+    assert bp.YlGnBu9[0] != fresh_params.LOCUS_COLOR
+
+
+@pytest.mark.parametrize('ptype, palette, ncolors', [('sequential', 4, 5),
+                                                     ('sequential', 'Reds', 5),
+                                                     ('divergent', 1, 12), ('categorical', 1, 2)])
+def test_get_palette_unknown(ptype, palette, ncolors):
+    with pytest.raises(KeyError):
+        params.get_palette(ptype, palette, ncolors)
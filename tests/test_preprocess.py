@@ -0,0 +1,142 @@
+""" tests for geoviz.preprocess """
+
+try:
+    import importlib.resources as pkg_resources
+except ImportError:
+    import importlib_resources as pkg_resources
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon, box
+
+import geoviz.preprocess as prc
+from geoviz import data
+
+SHAPE_FILES = ['us-albers.json.txt', 'us-albers-counties.json.txt']
+
+
+@pytest.mark.parametrize('shape_file', SHAPE_FILES)
+def test_read_topojson_matches_gdal(shape_file):
+    topojson = pkg_resources.read_text(data, shape_file)
+    expected = gpd.read_file(topojson)
+    result = prc.read_topojson(topojson)
+
+    assert result.columns.tolist() == expected.columns.tolist()
+    assert result.dtypes.equals(expected.dtypes)
+    assert result.drop(columns='geometry').equals(expected.drop(columns='geometry'))
+    assert shapely.equals_exact(result.geometry.values, expected.geometry.values).all()
+    assert (expected.crs is None and result.crs is None) or \
+           result.crs.equals(expected.crs, ignore_axis_order=True)
+
+
+@pytest.mark.parametrize('geography', ['state', 'county'])
+@pytest.mark.parametrize('simplify', [0.01, 0.1])
+def test_simplify_arcs_keeps_every_arc(geography, simplify):
+    topo = prc._load_topology(geography)
+    points, starts, lengths = prc._simplify_arcs(topo['points'], topo['arc_lengths'], simplify)
+
+    assert len(lengths) == len(starts) == len(topo['arc_lengths'])
+    assert lengths.sum() == len(points)
+    assert (lengths >= 2).all() and (lengths <= topo['arc_lengths']).all()
+    ## arc endpoints are where borders meet, they must not move
+    for first, last in [(starts, topo['arc_starts']),
+                        (starts + lengths - 1, topo['arc_starts'] + topo['arc_lengths'] - 1)]:
+        assert np.array_equal(points[first], topo['points'][last])
+
+
+@pytest.mark.parametrize('geography', ['state', 'county'])
+def test_simplified_shapes_are_valid(geography):
+    ## at a coarse tolerance, shapes are at least as valid as when simplified one by one
+    topo = prc._load_topology(geography)
+    per_shape = prc._build_topojson(topo)
+    prc._simplify(per_shape, 0.1)
+    geometries = prc._build_topojson(topo, 0.1).geometry.values
+
+    assert shapely.is_valid(geometries)[shapely.is_valid(per_shape.geometry.values)].all()
+    assert shapely.get_num_coordinates(geometries).min() >= 4
+
+
+def test_geometry_xs_ys():
+    holed = Polygon([(0, 0), (4, 0), (4, 4), (0, 4)], [[(1, 1), (2, 1), (2, 2), (1, 2)]])
+    multi = MultiPolygon([box(0, 0, 1, 1), box(2, 2, 3, 3)])
+    xs, ys = prc.geometry_xs_ys([None, Polygon(), holed, multi])
+
+    assert len(xs) == len(ys) == 4
+    assert len(xs[0]) == len(xs[1]) == 0 and len(ys[0]) == len(ys[1]) == 0
+    ## holes are not drawn
+    assert np.array_equal(xs[2], [0, 4, 4, 0, 0]) and np.array_equal(ys[2], [0, 0, 4, 4, 0])
+    ## parts are separated by NaN
+    assert np.array_equal(xs[3], [1, 1, 0, 0, 1, np.nan, 3, 3, 2, 2, 3], equal_nan=True)
+    assert np.array_equal(ys[3], [0, 1, 1, 0, 0, np.nan, 2, 3, 3, 2, 2], equal_nan=True)
+    assert xs[3].dtype == np.float32
+
+
+def test_geometry_xs_ys_empty():
+    assert prc.geometry_xs_ys([]) == ([], [])
+
+
+@pytest.mark.parametrize('name, stripped', [('Hillsborough County', 'Hillsborough'),
+                                            ('James City County, Virginia', 'James City'),
+                                            ('Yell County, Arkansas', 'Yell'),
+                                            ('Juneau City and Borough, Alaska', 'Juneau'),
+                                            ('Baltimore city', 'Baltimore'),
+                                            ('Hillsborough', 'Hillsborough')])
+def test_strip_name(name, stripped):
+    ## only a trailing area type is removed, never part of the name itself
+    assert prc.strip_name(name) == stripped
+    assert pd.Series([name]).str.replace(prc._LSAD_RE, '', regex=True)[0] == stripped
+
+
+@pytest.fixture(scope='module')
+def county_shapes():
+    return prc._load_shape('county', 0)
+
+
+@pytest.mark.parametrize('fips', [[1001, 6037, 99999], ['1001', '6037', '99999'],
+                                  ['01001', '06037', '99999']])
+def test_merge_to_geodf_fips(county_shapes, fips):
+    df = pd.DataFrame({'fips':fips, 'y':[1., 2., 3.]})
+    geo_df = prc.merge_to_geodf(county_shapes, df, 'fips', 'fips')
+
+    assert geo_df['y'].tolist() == [1., 2.]
+    assert geo_df['name'].tolist() == ['Autauga', 'Los Angeles']
+    ## the geo ID is kept once, as passed
+    assert 'fips_shape' not in geo_df
+    assert geo_df['fips'].tolist() == ([1001, 6037] if isinstance(fips[0], int)
+                                       else ['01001', '06037'])
+    assert isinstance(geo_df, gpd.GeoDataFrame)
+
+
+def test_merge_to_geodf_cbsa(county_shapes):
+    msa_file = str(pkg_resources.files(data) / 'test' / 'fitness_msa.csv')
+    msa_df = pd.read_csv(msa_file, dtype={'msa_code':str})
+    geo_df = prc.merge_to_geodf(county_shapes, msa_file, 'msa_code', 'cbsa')
+
+    assert 'fips_shape' not in geo_df
+    assert geo_df['fips'].is_unique
+    assert set(geo_df['msa_code']) <= set(msa_df['msa_code'])
+    ## e.g. Abilene, TX is Callahan, Jones and Taylor counties
+    assert sorted(geo_df.loc[geo_df['msa_code'] == '10180', 'fips']) == ['48059', '48253', '48441']
+
+
+def test_merge_to_geodf_duplicated_shape_fips(county_shapes):
+    shape_df = pd.concat([county_shapes, county_shapes[county_shapes['fips'] == '06037']])
+    df = pd.DataFrame({'fips':['01001', '06037'], 'y':[1., 2.]})
+    with pytest.raises(ValueError, match='06037'):
+        prc.merge_to_geodf(shape_df, df, 'fips', 'fips')
+
+
+@pytest.mark.skipif(not prc._HAS_PYARROW, reason='pyarrow is not installed')
+def test_precompute_shapes_returns_cache_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(prc, 'SHAPE_CACHE_DIR', str(tmp_path))
+    prc._load_shape.cache_clear()
+    cache_files = prc.precompute_shapes([0.05])
+
+    assert len(cache_files) == 2
+    assert sorted(cache_files) == sorted(str(path) for path in tmp_path.glob('*.feather'))
+
+    monkeypatch.setattr(prc, 'SHAPE_CACHE_DIR', '')
+    assert prc.precompute_shapes([0.05]) == []